@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Logica dell'applicazione di analisi di bilancio: lettura del file caricato,
+riclassificazione, calcolo degli indici e interfaccia Streamlit.
+Il modulo viene importato una sola volta per processo; lo script eseguito da
+Streamlit a ogni interazione si limita a chiamare run().
+"""
+
+import csv
+import re
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+import pandas as pd
+from io import BytesIO
+from typing import Optional, Tuple
+
+# --- Funzioni di Analisi (con logica di riclassificazione) ---
+
+ATTIVO_CORRENTE_KEYWORDS = [
+    "crediti v/clienti", "crediti tributari", "crediti v/altri",
+    "depositi bancari", "cassa", "rimanenze", "ratei e risconti attivi",
+    "liquidità immediate"
+]
+PASSIVO_CORRENTE_KEYWORDS = [
+    "debiti verso fornitori", "debiti tributari", "debiti v/istit.",
+    "altri debiti", "ratei e risconti passivi"
+]
+
+# Un'unica alternanza per lista: la stringa è passata al kernel regex di Arrow
+# (motore RE2, vedi _contains), la versione compilata serve agli helper su una voce.
+# Sono solo testo letterale e alternanze, quindi i due motori danno lo stesso esito
+_ATTIVO_PATTERN = "|".join(re.escape(k) for k in ATTIVO_CORRENTE_KEYWORDS)
+_PASSIVO_PATTERN = "|".join(re.escape(k) for k in PASSIVO_CORRENTE_KEYWORDS)
+_ATTIVO_RE = re.compile(_ATTIVO_PATTERN)
+_PASSIVO_RE = re.compile(_PASSIVO_PATTERN)
+
+# Pattern delle voci usati nella riclassificazione, come stringhe RE2 per _contains
+_FONDI_AMM_PATTERN = "f.do amm.|fondo amm"
+_PATRIMONIO_NETTO_PATTERN = "capitale sociale|riserva|utile|perdita"
+_LIQUIDITA_PATTERN = "depositi bancari|cassa"
+_RIMANENZE_PATTERN = "rimanenze"
+_VALORE_PRODUZIONE_PATTERN = "ricavi|contributi|variazione rimanenze"
+_COSTI_ESTERNI_PATTERN = "costi mat|acquisto di materie|costi per servizi|godimento beni"
+_PERSONALE_PATTERN = "personale|salari|stipendi|oneri sociali"
+_AMMORTAMENTI_PATTERN = "ammortamenti"
+_ONERI_DIVERSI_PATTERN = "oneri diversi|perdite su crediti|sopravvenienze passive|imposte e tasse"
+
+# Formato numerico italiano: punto per le migliaia, virgola per i decimali
+_IMPORTO_TRANS = str.maketrans({'.': '', ',': '.'})
+# Limite per la somma dei valori assoluti in centesimi: ogni totale e margine, anche
+# con le voci contate in più aggregati del Conto Economico, resta entro l'int64
+_MAX_CENTESIMI = 2 ** 63 // 8
+# Scambio simultaneo dei separatori dal formato inglese a quello italiano
+_EURO_TRANS = str.maketrans({',': '.', '.': ','})
+
+def is_attivo_corrente(descrizione: str) -> bool:
+    """Verifica se una voce dell'attivo è da considerarsi corrente."""
+    return _ATTIVO_RE.search(descrizione.lower()) is not None
+
+def is_passivo_corrente(descrizione: str) -> bool:
+    """Verifica se una voce del passivo è da considerarsi corrente."""
+    return _PASSIVO_RE.search(descrizione.lower()) is not None
+
+def _contains(voci: pa.Array, pattern: str) -> np.ndarray:
+    """
+    Maschera delle voci che contengono il pattern, calcolata dal kernel regex di Arrow.
+    Il pattern segue la sintassi RE2 e viene compilato da Arrow a ogni chiamata.
+    """
+    mask = pc.match_substring_regex(voci, pattern)
+    return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+def calculate_kpis(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcola gli indicatori di bilancio (KPI) partendo da un DataFrame strutturato,
+    eseguendo una riclassificazione del bilancio.
+    """
+    # --- 1. Preparazione dei Dati ---
+    # Gli importi già numerici (es. da Excel o CSV letto con decimal=',') non vanno
+    # ripuliti; le sole celle di testo in formato italiano "1.234,56" sono convertite
+    # in un'unica passata, anche quando la colonna mescola numeri e testo
+    if not pd.api.types.is_numeric_dtype(df['IMPORTO']):
+        testuali = df['IMPORTO'].map(type) == str
+        df['IMPORTO'] = df['IMPORTO'].where(~testuali, df.loc[testuali, 'IMPORTO'].str.translate(_IMPORTO_TRANS))
+    df['IMPORTO'] = pd.to_numeric(df['IMPORTO'], errors='coerce').fillna(0)
+    # Gli importi non finiti (es. "inf") valgono zero come quelli non numerici
+    df['IMPORTO'] = df['IMPORTO'].where(np.isfinite(df['IMPORTO']), 0)
+    # Aggregati calcolati in centesimi interi: le somme sono esatte e
+    # vengono riportate in euro solo nel DataFrame di output
+    centesimi = (df['IMPORTO'] * 100).round()
+    if centesimi.abs().sum() >= _MAX_CENTESIMI:
+        raise ValueError("Il file contiene importi troppo elevati per essere analizzati.")
+    importi = centesimi.astype(np.int64).to_numpy()
+    # Voci in minuscolo per confronti non case-sensitive, come array Arrow locale:
+    # il DataFrame di partenza non riceve colonne di servizio
+    voci = pa.array(df['VOCE'].str.lower(), type=pa.string())
+
+    # --- 2. Suddivisione per Sezioni ---
+    # Ogni sezione è una maschera booleana su SEZIONE, senza creare sotto-DataFrame.
+    # Su una colonna categorica .str.upper() lavora sulle sole categorie
+    sezione = df['SEZIONE'].str.upper()
+    in_attivo, in_passivo, in_ce = (
+        (sezione == nome).to_numpy(dtype=bool, na_value=False)
+        for nome in ("ATTIVITA'", "PASSIVITA'", "CONTO ECONOMICO")
+    )
+
+    # --- 3. Riclassificazione e Calcolo Aggregati Stato Patrimoniale ---
+    # Le sezioni assenti dal file valgono zero senza scansionare le voci; per le altre
+    # le somme avvengono per indicizzazione booleana sugli importi
+
+    # Separazione delle componenti dal lato "PASSIVITA'" del file originale
+    if not in_passivo.any():
+        fondi_ammortamento = patrimonio_netto = debiti_totali = passivo_corrente = 0
+    else:
+        voci_passivo, importi_passivo = voci.filter(in_passivo), importi[in_passivo]
+        filtro_fondi = _contains(voci_passivo, _FONDI_AMM_PATTERN)
+        filtro_pn = _contains(voci_passivo, _PATRIMONIO_NETTO_PATTERN)
+        fondi_ammortamento = importi_passivo[filtro_fondi].sum()
+        patrimonio_netto = importi_passivo[filtro_pn].sum()
+
+        # I debiti sono ciò che rimane nella sezione PASSIVITA' dopo aver tolto PN e Fondi Amm.
+        filtro_debiti = ~(filtro_fondi | filtro_pn)
+        debiti_totali = importi_passivo[filtro_debiti].sum()
+        passivo_corrente = importi_passivo[filtro_debiti & _contains(voci_passivo, _PASSIVO_PATTERN)].sum()
+
+    totale_passivo_e_netto = debiti_totali + patrimonio_netto + fondi_ammortamento
+    passivita_consolidate = debiti_totali - passivo_corrente
+
+    # Calcolo aggregati dell'Attivo
+    if not in_attivo.any():
+        totale_attivo_grezzo = attivo_corrente = liquidita_immediate = rimanenze = 0
+    else:
+        voci_attivo, importi_attivo = voci.filter(in_attivo), importi[in_attivo]
+        totale_attivo_grezzo = importi_attivo.sum()
+        filtro_corrente = _contains(voci_attivo, _ATTIVO_PATTERN)
+        attivo_corrente = importi_attivo[filtro_corrente].sum()
+
+        # Dettagli dell'Attivo Corrente: le parole chiave di liquidità e rimanenze
+        # fanno parte di ATTIVO_CORRENTE_KEYWORDS, quindi basta scansionare le voci correnti
+        voci_corrente, importi_corrente = voci_attivo.filter(filtro_corrente), importi_attivo[filtro_corrente]
+        liquidita_immediate = importi_corrente[_contains(voci_corrente, _LIQUIDITA_PATTERN)].sum()
+        rimanenze = importi_corrente[_contains(voci_corrente, _RIMANENZE_PATTERN)].sum()
+
+    immobilizzazioni_lorde = totale_attivo_grezzo - attivo_corrente
+    immobilizzazioni_nette = immobilizzazioni_lorde - fondi_ammortamento
+    totale_attivo_riclassificato = immobilizzazioni_nette + attivo_corrente
+
+    # --- 4. Riclassificazione Conto Economico a Valore Aggiunto ---
+    if not in_ce.any():
+        valore_produzione = costi_esterni = costi_personale = ammortamenti = oneri_diversi_gestione = 0
+    else:
+        voci_ce, importi_ce = voci.filter(in_ce), importi[in_ce]
+        valore_produzione = importi_ce[_contains(voci_ce, _VALORE_PRODUZIONE_PATTERN)].sum()
+        costi_esterni = importi_ce[_contains(voci_ce, _COSTI_ESTERNI_PATTERN)].sum()
+        costi_personale = importi_ce[_contains(voci_ce, _PERSONALE_PATTERN)].sum()
+        ammortamenti = importi_ce[_contains(voci_ce, _AMMORTAMENTI_PATTERN)].sum()
+        oneri_diversi_gestione = importi_ce[_contains(voci_ce, _ONERI_DIVERSI_PATTERN)].sum()
+    valore_aggiunto = valore_produzione - costi_esterni
+    ebitda = valore_aggiunto - costi_personale
+    ebit = ebitda - ammortamenti - oneri_diversi_gestione
+
+    # --- 5. Calcolo Indici, Margini e Controlli ---
+    ccn = attivo_corrente - passivo_corrente
+    margine_tesoreria = (attivo_corrente - rimanenze) - passivo_corrente
+    current_ratio = (attivo_corrente / passivo_corrente) if passivo_corrente else 0
+    quick_ratio = ((attivo_corrente - rimanenze) / passivo_corrente) if passivo_corrente else 0
+    ebitda_margin = (ebitda / valore_produzione) if valore_produzione else 0
+    check_quadratura = totale_attivo_grezzo - totale_passivo_e_netto
+
+    # --- 6. Creazione del DataFrame di Output ---
+    # Indicatori raggruppati per sezione: i titoli diventano una colonna,
+    # non righe separatrici da filtrare in fase di visualizzazione
+    sections = [
+        ("Controllo di Quadratura", [
+            ("Controllo Quadratura (Attivo - Passivo e Netto)", check_quadratura),
+        ]),
+        ("Stato Patrimoniale Riclassificato", [
+            ("Immobilizzazioni Nette", immobilizzazioni_nette),
+            ("Attivo Corrente", attivo_corrente),
+            ("   di cui Liquidità Immediate", liquidita_immediate),
+            ("   di cui Rimanenze", rimanenze),
+            ("TOTALE ATTIVO RICLASSIFICATO", totale_attivo_riclassificato),
+            ("Patrimonio Netto", patrimonio_netto),
+            ("Passività Consolidate (M/L Termine)", passivita_consolidate),
+            ("Passivo Corrente (Breve Termine)", passivo_corrente),
+            ("TOTALE PASSIVO E NETTO", patrimonio_netto + debiti_totali),
+        ]),
+        ("Conto Economico a Valore Aggiunto", [
+            ("Valore della Produzione", valore_produzione),
+            ("Costi Esterni", costi_esterni),
+            ("Valore Aggiunto", valore_aggiunto),
+            ("Costo del Personale", costi_personale),
+            ("EBITDA (Margine Operativo Lordo)", ebitda),
+            ("Ammortamenti e Altri Oneri", ammortamenti + oneri_diversi_gestione),
+            ("EBIT (Risultato Operativo)", ebit),
+        ]),
+        ("Indici e Margini", [
+            ("Capitale Circolante Netto (CCN)", ccn),
+            ("Margine di Tesoreria", margine_tesoreria),
+            ("Current Ratio", f"{current_ratio:.2f}"),
+            ("Quick Ratio (Acid Test)", f"{quick_ratio:.2f}"),
+            ("EBITDA Margin", f"{ebitda_margin:.2%}"),
+        ]),
+    ]
+
+    kpis_df = pd.DataFrame({
+        'Sezione': [titolo for titolo, righe in sections for _ in righe],
+        'Indicatore': [label for _, righe in sections for label, _ in righe],
+        'Valore': [valore if isinstance(valore, str) else valore / 100
+                   for _, righe in sections for _, valore in righe],
+    })
+    return kpis_df
+
+
+REQUIRED_COLUMNS = ['VOCE', 'IMPORTO', 'SEZIONE']
+# Byte iniziali del CSV usati per riconoscere il separatore
+_CSV_SNIFF_BYTES = 64 * 1024
+
+
+def format_euro(valore: float) -> str:
+    """Formatta un importo in euro con separatori italiani (es. € 1.234,56)."""
+    return f"€ {valore:,.2f}".translate(_EURO_TRANS)
+
+
+def _sniff_csv_separator(file_bytes: bytes) -> str:
+    """Individua il separatore del CSV analizzando solo le prime righe del file."""
+    sample = file_bytes[:_CSV_SNIFF_BYTES].decode('utf-8', errors='ignore')
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=';,\t').delimiter
+    except csv.Error:
+        return ','
+
+
+def read_uploaded_file(file_bytes: bytes, file_name: str) -> pd.DataFrame:
+    """Legge il contenuto di un file CSV o Excel caricato in un DataFrame."""
+    if file_name.endswith('.csv'):
+        sep = _sniff_csv_separator(file_bytes)
+        if sep == ';':
+            # Formato italiano: virgola per i decimali e punto per le migliaia
+            df = pd.read_csv(BytesIO(file_bytes), sep=';', decimal=',', thousands='.')
+        else:
+            df = pd.read_csv(BytesIO(file_bytes), sep=sep)
+    else:
+        df = pd.read_excel(BytesIO(file_bytes), engine='calamine')
+    return df
+
+
+def format_kpis(kpis_df: pd.DataFrame) -> pd.DataFrame:
+    """Prepara i KPI per la visualizzazione formattando gli importi in euro."""
+    # Solo i valori numerici vengono formattati come importi: le stringhe
+    # (indici già formattati) restano invariate
+    valori = kpis_df['Valore']
+    numerici = valori.map(type) != str
+    valori = valori.where(~numerici, valori[numerici].astype(float).map(format_euro))
+    return pd.DataFrame({
+        'Sezione': kpis_df['Sezione'].to_numpy(),
+        'Indicatore': kpis_df['Indicatore'].to_numpy(),
+        'Valore': valori.to_numpy(),
+    })
+
+
+@st.cache_data(show_spinner=False)
+def analyze_file(file_bytes: bytes, file_name: str) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """
+    Legge il file caricato e ne calcola i KPI, grezzi e formattati.
+    Streamlit memorizza il risultato in base al contenuto del file, quindi le
+    riesecuzioni dello script con lo stesso file non ripetono l'analisi.
+    Se mancano colonne obbligatorie i KPI sono restituiti come None.
+    """
+    df = read_uploaded_file(file_bytes, file_name)
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        return df, None, None
+
+    # VOCE su stringhe Arrow, così le operazioni .str.* usano i kernel nativi
+    # (le voci mancanti restano NA e non corrispondono ad alcun pattern);
+    # SEZIONE normalizzata una sola volta in categorie maiuscole (i valori mancanti restano NA)
+    df['VOCE'] = df['VOCE'].astype('string[pyarrow]')
+    df['SEZIONE'] = df['SEZIONE'].str.upper().astype('category')
+
+    kpis_df = calculate_kpis(df)
+    return df, kpis_df, format_kpis(kpis_df)
+
+
+@st.cache_data(show_spinner=False)
+def build_excel(df: pd.DataFrame, kpis_df: pd.DataFrame) -> bytes:
+    """
+    Genera il file Excel scaricabile con i dati originali e i KPI.
+    Il risultato è memorizzato da Streamlit, quindi la cartella di lavoro
+    viene scritta una sola volta per ogni file caricato.
+    """
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='Dati Originali', index=False)
+        kpis_df.to_excel(writer, sheet_name='Analisi KPI', index=False)
+    return output.getvalue()
+
+
+# --- Interfaccia Streamlit ---
+
+def run() -> None:
+    """Disegna l'interfaccia Streamlit e gestisce il file caricato."""
+    st.set_page_config(page_title="Analisi di Bilancio", layout="wide", initial_sidebar_state="collapsed")
+
+    st.title("📊 Analizzatore di Bilancio da File Excel")
+    st.caption("Carica un file Excel (.xlsx) o CSV con colonne 'VOCE', 'IMPORTO', 'SEZIONE' per generare un'analisi automatica.")
+
+    uploaded_file = st.file_uploader(
+        "Seleziona il tuo file di bilancio", 
+        type=['xlsx', 'xls', 'csv'],
+        help="Il file deve contenere le colonne: VOCE (descrizione), IMPORTO (valore numerico), SEZIONE (es. ATTIVITA', PASSIVITA', CONTO ECONOMICO)"
+    )
+
+    if uploaded_file is not None:
+        try:
+            with st.spinner('Elaborazione in corso...'):
+                df, kpis_df, formatted_kpis = analyze_file(uploaded_file.getvalue(), uploaded_file.name)
+
+            # Validazione delle colonne necessarie
+            if kpis_df is None:
+                st.error(f"Errore: Il file deve contenere le seguenti colonne: {', '.join(REQUIRED_COLUMNS)}")
+            else:
+                st.success("Analisi completata!")
+
+                st.header("Indicatori e Margini di Bilancio (KPIs)")
+
+                # Una tabella per sezione, ciascuna preceduta dal proprio titolo
+                for sezione, voci in formatted_kpis.groupby('Sezione', sort=False):
+                    st.subheader(sezione)
+                    st.dataframe(
+                        voci[['Indicatore', 'Valore']], 
+                        use_container_width=True, 
+                        hide_index=True,
+                        column_config={"Indicatore": st.column_config.TextColumn(width="large")}
+                    )
+
+                st.header("Dati originali caricati")
+                st.dataframe(df, use_container_width=True, hide_index=True)
+
+                # Funzionalità di download
+                st.download_button(
+                    label="📥 Scarica Analisi Completa (Excel)",
+                    data=build_excel(df, kpis_df),
+                    file_name=f"analisi_bilancio_{uploaded_file.name}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
+        except Exception as e:
+            st.error(f"Si è verificato un errore durante l'elaborazione del file: {e}")
+            st.warning("Assicurati che il file sia nel formato corretto e non sia corrotto.")
+    else:
+        st.info("In attesa di un file di bilancio per iniziare l'analisi.")
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Verifiche di calculate_kpis rispetto alla riclassificazione originale."""
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from analisi_core import (
+    ATTIVO_CORRENTE_KEYWORDS, PASSIVO_CORRENTE_KEYWORDS, _ATTIVO_PATTERN, _PASSIVO_PATTERN,
+    _contains, calculate_kpis, is_attivo_corrente, is_passivo_corrente,
+)
+
+# Alcune voci corrispondono a più categorie del Conto Economico
+# (es. "contributi" e "personale"): devono concorrere a tutti i totali
+VOCI = [
+    ("Crediti v/clienti", "120.000,00", "ATTIVITA'"),
+    ("Depositi bancari", "30.000,00", "ATTIVITA'"),
+    ("Rimanenze di merci", "15.000,00", "ATTIVITA'"),
+    ("Impianti e macchinari", "80.000,00", "ATTIVITA'"),
+    ("Capitale sociale", "50.000,00", "PASSIVITA'"),
+    ("F.do amm. impianti", "20.000,00", "PASSIVITA'"),
+    ("Debiti verso fornitori", "60.000,00", "PASSIVITA'"),
+    ("Mutui passivi", "115.000,00", "PASSIVITA'"),
+    ("Ricavi delle vendite", "50.000,00", "CONTO ECONOMICO"),
+    ("Contributi in conto esercizio", "3.000,00", "CONTO ECONOMICO"),
+    ("Costi per servizi", "10.000,00", "CONTO ECONOMICO"),
+    ("Salari e stipendi", "15.000,00", "CONTO ECONOMICO"),
+    ("Contributi previdenziali personale", "3.000,00", "CONTO ECONOMICO"),
+    ("Ammortamenti e oneri diversi", "2.500,00", "CONTO ECONOMICO"),
+]
+
+
+def _dataframe() -> pd.DataFrame:
+    return pd.DataFrame(VOCI, columns=['VOCE', 'IMPORTO', 'SEZIONE'])
+
+
+def _kpis(df: pd.DataFrame) -> pd.Series:
+    return calculate_kpis(df).set_index('Indicatore')['Valore']
+
+
+def _conto_economico_originale(df: pd.DataFrame) -> dict:
+    """Somme indipendenti per categoria, come nella versione originale di analisi.py."""
+    importi = pd.to_numeric(
+        df['IMPORTO'].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    )
+    df_ce = df[df['SEZIONE'].str.upper() == "CONTO ECONOMICO"]
+    voci = df_ce['VOCE'].str.lower()
+    importi = importi[df_ce.index]
+
+    def somma(pattern: str) -> float:
+        return importi[voci.str.contains(pattern)].sum()
+
+    valore_produzione = somma("ricavi|contributi|variazione rimanenze")
+    costi_esterni = somma("costi mat|acquisto di materie|costi per servizi|godimento beni")
+    costi_personale = somma("personale|salari|stipendi|oneri sociali")
+    ammortamenti = somma("ammortamenti")
+    oneri_diversi = somma("oneri diversi|perdite su crediti|sopravvenienze passive|imposte e tasse")
+    ebitda = valore_produzione - costi_esterni - costi_personale
+    return {
+        "Valore della Produzione": valore_produzione,
+        "Costi Esterni": costi_esterni,
+        "Valore Aggiunto": valore_produzione - costi_esterni,
+        "Costo del Personale": costi_personale,
+        "EBITDA (Margine Operativo Lordo)": ebitda,
+        "Ammortamenti e Altri Oneri": ammortamenti + oneri_diversi,
+        "EBIT (Risultato Operativo)": ebitda - ammortamenti - oneri_diversi,
+        "EBITDA Margin": f"{ebitda / valore_produzione:.2%}",
+    }
+
+
+def test_conto_economico_somma_voci_in_tutte_le_categorie():
+    kpis = _kpis(_dataframe())
+    attesi = _conto_economico_originale(_dataframe())
+
+    for indicatore, atteso in attesi.items():
+        if isinstance(atteso, str):
+            assert kpis[indicatore] == atteso, indicatore
+        else:
+            assert kpis[indicatore] == pytest.approx(atteso), indicatore
+
+    # La voce "Contributi previdenziali personale" conta sia nel Valore della
+    # Produzione sia nel Costo del Personale
+    assert kpis["Costo del Personale"] == pytest.approx(18000)
+    assert kpis["Valore della Produzione"] == pytest.approx(56000)
+
+
+def test_importi_misti_numeri_e_testo():
+    # Da Excel una colonna può mescolare celle numeriche e testo in formato italiano:
+    # solo il testo va ripulito dai separatori
+    df = pd.DataFrame({
+        'VOCE': ["Cassa", "Depositi bancari"],
+        'IMPORTO': [100.5, "1.234,56"],
+        'SEZIONE': ["ATTIVITA'", "ATTIVITA'"],
+    })
+    kpis = _kpis(df)
+    assert kpis["   di cui Liquidità Immediate"] == pytest.approx(1335.06)
+
+
+def test_importi_non_finiti_valgono_zero():
+    df = _dataframe()
+    df.loc[len(df)] = ("Altri ricavi", "inf", "CONTO ECONOMICO")
+    pd.testing.assert_series_equal(_kpis(df), _kpis(_dataframe()))
+
+
+def test_importi_fuori_scala():
+    df = _dataframe()
+    df.loc[len(df)] = ("Altri ricavi", 1e17, "CONTO ECONOMICO")
+    with pytest.raises(ValueError):
+        calculate_kpis(df)
+
+
+def test_totali_fuori_scala():
+    # Ogni riga è rappresentabile, ma la loro somma supererebbe l'int64
+    df = pd.DataFrame({
+        'VOCE': ["Cassa", "Cassa"],
+        'IMPORTO': [6e16, 6e16],
+        'SEZIONE': ["ATTIVITA'", "ATTIVITA'"],
+    })
+    with pytest.raises(ValueError):
+        calculate_kpis(df)
+
+
+def test_sezione_categorica_non_normalizzata():
+    df = _dataframe()
+    df['SEZIONE'] = pd.Categorical(df['SEZIONE'].str.lower())
+    pd.testing.assert_series_equal(_kpis(df), _kpis(_dataframe()))
+
+
+def test_helper_e_kernel_arrow_concordano():
+    # is_attivo_corrente/is_passivo_corrente usano il modulo re, calculate_kpis il
+    # motore RE2 di Arrow: sulle stesse voci devono dare lo stesso esito
+    voci = [voce for voce, _, _ in VOCI] + ATTIVO_CORRENTE_KEYWORDS + PASSIVO_CORRENTE_KEYWORDS
+    minuscole = pa.array([voce.lower() for voce in voci])
+    assert list(_contains(minuscole, _ATTIVO_PATTERN)) == [is_attivo_corrente(v) for v in voci]
+    assert list(_contains(minuscole, _PASSIVO_PATTERN)) == [is_passivo_corrente(v) for v in voci]
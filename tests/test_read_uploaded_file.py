@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Verifiche della lettura dei CSV caricati e del riconoscimento del separatore."""
+
+import pytest
+
+from analisi_core import read_uploaded_file
+
+
+def test_csv_italiano_con_punto_e_virgola():
+    # Separatore ';' con virgola decimale e punto per le migliaia
+    contenuto = (
+        "VOCE;IMPORTO;SEZIONE\n"
+        "Crediti v/clienti;12.500,00;ATTIVITA'\n"
+        "Cassa;150,25;ATTIVITA'\n"
+    ).encode('utf-8')
+    df = read_uploaded_file(contenuto, "bilancio.csv")
+    assert list(df.columns) == ['VOCE', 'IMPORTO', 'SEZIONE']
+    assert list(df['IMPORTO']) == pytest.approx([12500.0, 150.25])
+
+
+def test_csv_con_virgola_come_separatore():
+    # Il separatore individuato è la virgola: gli importi usano il punto decimale
+    contenuto = (
+        "VOCE,IMPORTO,SEZIONE\n"
+        "Crediti v/clienti,12500.00,ATTIVITA'\n"
+        "Cassa,150.25,ATTIVITA'\n"
+    ).encode('utf-8')
+    df = read_uploaded_file(contenuto, "bilancio.csv")
+    assert list(df.columns) == ['VOCE', 'IMPORTO', 'SEZIONE']
+    assert list(df['IMPORTO']) == pytest.approx([12500.0, 150.25])
+
+
+def test_csv_a_colonna_singola():
+    # Senza separatori riconoscibili la lettura ricade sulla virgola
+    contenuto = "VOCE\nCrediti v/clienti\nCassa\n".encode('utf-8')
+    df = read_uploaded_file(contenuto, "bilancio.csv")
+    assert list(df.columns) == ['VOCE']
+    assert list(df['VOCE']) == ["Crediti v/clienti", "Cassa"]